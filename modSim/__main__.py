@@ -9,17 +9,23 @@ def main():
     args = parser.parse_args()
 
     # Configure the root logger
-    log_level = logging.INFO
+    log_level = logging.WARNING
     if args.debug:
         log_level = logging.DEBUG
 
+    # Skip per-record caller, thread and process lookups; the format doesn't use them
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging._srcfile = None
+
     logging.basicConfig(
         level=log_level,
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         handlers=[logging.StreamHandler()]
     )
 
-    Server().run()
+    Server(debug=args.debug).run()
 
 if __name__ == "__main__":
     main()
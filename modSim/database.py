@@ -1,100 +1,155 @@
 import sqlite3
-import os
 import json
 import logging
+import threading
+
+from modSim.utils import REGISTER_TYPE_MAP
 
 logger = logging.getLogger("DatabaseLogger")
 
 class Database:
+    _create_stmt = """
+        CREATE TABLE IF NOT EXISTS registers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            server_id INTEGER NULL,         -- Server ID
+            slave_id INTEGER NOT NULL,      -- Slave ID associated with the register
+            register_type INTEGER NOT NULL, -- Modbus function-code group (0=all, 1=co, 2=di, 3=hr, 4=ir)
+            address INTEGER NOT NULL,       -- Start address of the register (or 0 for all)
+            address_end INTEGER NULL,       -- End address for range simulation (NULL for single address)
+            register_size INTEGER NULL,     -- Size of register type (NULL to use server default)
+            simulate INTEGER NOT NULL       -- Whether the register is simulated (0 or 1)
+        )
+        """
+    _select_stmt = "SELECT server_id, slave_id, register_type, address, address_end, register_size, simulate FROM registers"
+    _insert_stmt = """
+        INSERT INTO registers (server_id, slave_id, register_type, address, address_end, register_size, simulate)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+
     def __init__(self, db_path="settings.db"):
         self.db_path = db_path
+
+        # Shared connection, used from both the main loop and the web server thread
+        self._conn = self._connect()
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
         self._initialize_database()
 
+        # Registers only change through save_registers, so cache them between saves
+        self._dirty = True
+        self._cached_regs = []
+
+    def _connect(self):
+        """Open a connection tuned for frequent reads and small writes."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
     def _initialize_database(self):
         try:
-            if not os.path.exists(self.db_path):
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    # Create registers table
-                    cursor.execute(
-                        """
-                        CREATE TABLE IF NOT EXISTS registers (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            server_id INTEGER NULL,         -- Server ID
-                            slave_id INTEGER NOT NULL,      -- Slave ID associated with the register
-                            register_type TEXT NOT NULL,    -- Type of register (e.g., 'hr', 'ir', 'co', 'di')
-                            address INTEGER NOT NULL,       -- Start address of the register (or 0 for all)
-                            address_end INTEGER NULL,       -- End address for range simulation (NULL for single address)
-                            register_size INTEGER NULL,     -- Size of register type (NULL to use server default)
-                            simulate INTEGER NOT NULL       -- Whether the register is simulated (0 or 1)
-                        )
-                        """
-                    )
-                    conn.commit()
+            with self._lock, self._conn as conn:
+                conn.execute(self._create_stmt)
+                self._migrate_register_type(conn)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_regs_server ON registers(server_id)")
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {e}")
 
+    def _migrate_register_type(self, conn):
+        """Convert a registers table that stores register_type as TEXT to integer codes."""
+        columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(registers)")}
+        if columns.get("register_type") != "TEXT":
+            return
+
+        logger.info("Migrating registers.register_type to integer codes")
+        cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in REGISTER_TYPE_MAP.items())
+        conn.execute("BEGIN")
+        conn.execute("DROP INDEX IF EXISTS idx_regs_server")
+        conn.execute("ALTER TABLE registers RENAME TO registers_old")
+        conn.execute(self._create_stmt)
+        conn.execute(
+            f"""
+            INSERT INTO registers (server_id, slave_id, register_type, address, address_end, register_size, simulate)
+            SELECT server_id, slave_id, CASE register_type {cases} END, address, address_end, register_size, simulate
+            FROM registers_old
+            WHERE register_type IN ({", ".join(f"'{name}'" for name in REGISTER_TYPE_MAP)})
+            """
+        )
+        total = conn.execute("SELECT count(*) FROM registers_old").fetchone()[0]
+        migrated = conn.execute("SELECT count(*) FROM registers").fetchone()[0]
+        if migrated < total:
+            unknown = [row[0] for row in conn.execute(
+                f"""
+                SELECT DISTINCT register_type FROM registers_old
+                WHERE register_type NOT IN ({", ".join(f"'{name}'" for name in REGISTER_TYPE_MAP)})
+                """
+            )]
+            logger.warning(
+                "Discarded %d of %d registers with unsupported register_type values %s during migration",
+                total - migrated, total, unknown
+            )
+        conn.execute("DROP TABLE registers_old")
+
     def get_registers(self):
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT server_id, slave_id, register_type, address, address_end, register_size, simulate FROM registers")
-                results = cursor.fetchall()
-                return [
-                    {
-                        "server_id": row[0],
-                        "slave_id": row[1],
-                        "register_type": row[2],
-                        "address": row[3],
-                        "address_end": row[4],
-                        "register_size": row[5],
-                        "simulate": bool(row[6])
-                    }
-                    for row in results
-                ]
+            with self._lock:
+                if not self._dirty:
+                    return self._cached_regs
+
+                # Rows are returned as sqlite3.Row, indexable by column name
+                self._cached_regs = self._conn.execute(self._select_stmt).fetchall()
+                self._dirty = False
+                return self._cached_regs
         except sqlite3.Error as e:
             logger.error(f"Error fetching registers: {e}")
             return []
 
     def save_registers(self, registers):
+        errors = []
+
+        # Validate every register before touching the database
+        for reg in registers:
+            if reg.get("slave_id") is None:
+                errors.append("Missing slave_id")
+
+            register_type = reg.get("register_type")
+            if not register_type:
+                errors.append("Missing register_type")
+            elif register_type not in REGISTER_TYPE_MAP:
+                errors.append(f"Unsupported register_type: {register_type}")
+
+        if errors:
+            return {"success": False, "errors": errors}
+
+        rows = [
+            (
+                reg.get("server_id", None),
+                reg["slave_id"],
+                REGISTER_TYPE_MAP[reg["register_type"]],
+                reg.get("address", 0),
+                reg.get("address_end", None),
+                reg.get("register_size", None),
+                int(reg.get("simulate", False))
+            )
+            for reg in registers
+        ]
+
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                # Clear existing registers
-                cursor.execute("DELETE FROM registers")
-                # Insert new registers
-
-                errors = []
-
-                for reg in registers:
-                    server_id = reg.get("server_id", None)
-                    slave_id = reg.get("slave_id")
-                    register_type = reg.get("register_type")
-                    address = reg.get("address", 0)
-                    address_end = reg.get("address_end", None)
-                    register_size = reg.get("register_size", None)
-                    simulate = int(reg.get("simulate", False))
-
-                    if slave_id is None:
-                        errors.append("Missing slave_id")
-
-                    if not register_type:
-                        errors.append("Missing register_type")
-
-                    if errors:
-                         return {"success": False, "errors": errors}
-
-                    cursor.execute(
-                        """
-                        INSERT INTO registers (server_id, slave_id, register_type, address, address_end, register_size, simulate)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        (server_id, slave_id, register_type, address, address_end, register_size, simulate)
-                    )
-
-                conn.commit()
-                return {"success": True, "errors": []}
-            
+            with self._lock, self._conn:
+                # Replace all registers in a single transaction
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM registers")
+                self._conn.executemany(self._insert_stmt, rows)
+                self._dirty = True
+            return {"success": True, "errors": []}
+
         except sqlite3.Error as e:
             logger.error(f"Error saving registers: {e}")
             return {"success": False, "errors": [str(e)]}
+
+    def close(self):
+        """Close the shared database connection."""
+        with self._lock:
+            self._conn.close()
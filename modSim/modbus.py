@@ -1,9 +1,8 @@
 """ Handles Modbus objects """
-import copy
 import logging
 import threading
-import random
 
+import numpy as np
 from pymodbus import ModbusDeviceIdentification
 from pymodbus.datastore import (
     ModbusSequentialDataBlock,
@@ -12,8 +11,54 @@ from pymodbus.datastore import (
 )
 from pymodbus.server import StartTcpServer
 
+from modSim.utils import REGISTER_TYPE_MAP, REGISTER_TYPE_NAMES
+
 logger = logging.getLogger(__name__)
 
+# Register type code used to simulate every type at once
+_ALL_TYPES = REGISTER_TYPE_MAP["all"]
+
+# Map: register type code -> key of the datablock in a device context's store
+_STORE_KEYS = {1: "c", 2: "d", 3: "h", 4: "i"}
+
+# Register type codes holding bits rather than 16-bit words (coils, discrete inputs)
+_BIT_TYPES = (1, 2)
+
+
+def _gen_block(code, count, rng):
+    """Generate a block of random values for the given register type code.
+
+    Values are generated at their Modbus width (bits, 16-bit words) and only
+    converted to a list at the end, since pymodbus datablocks require lists.
+    """
+    if count <= 0:
+        return []
+    if code in _BIT_TYPES:
+        return rng.integers(0, 2, size=count, dtype=np.bool_).tolist()
+    return rng.integers(0, 500, size=count, dtype=np.uint16).tolist()
+
+
+def _write_full(block, code, size, rng):
+    """Write a full block of random values for the given type code, starting at address 0.
+
+    Writes straight into the datablock's value list, skipping the validated
+    setValues path. The device context maps address 0 to offset 1 of the block.
+    """
+    block.values[1:1 + size] = _gen_block(code, size, rng)
+
+
+class VersionedDeviceContext(ModbusDeviceContext):
+    """Device context that counts writes, so readers can tell when its values changed"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def setValues(self, fc_as_hex, address, values):
+        result = super().setValues(fc_as_hex, address, values)
+        self.version += 1
+        return result
+
 
 def buildModbusContext(numberOfSlaves, registerSizes=None):
     """
@@ -29,18 +74,21 @@ def buildModbusContext(numberOfSlaves, registerSizes=None):
     if registerSizes is None:
         registerSizes = {'co': 100, 'di': 100, 'hr': 100, 'ir': 100}
 
-    slaves = {}
-
-    baseDataStore = ModbusDeviceContext(
-        di=ModbusSequentialDataBlock(0, [False] * (registerSizes.get('di', 100) + 1)),
-        co=ModbusSequentialDataBlock(0, [False] * (registerSizes.get('co', 100) + 1)),
-        hr=ModbusSequentialDataBlock(0, [0] * (registerSizes.get('hr', 100) + 1)),
-        ir=ModbusSequentialDataBlock(0, [0] * (registerSizes.get('ir', 100) + 1))
-    )
+    # Prototype value lists; each ModbusSequentialDataBlock makes its own copy
+    di0 = [False] * (registerSizes.get('di', 100) + 1)
+    co0 = [False] * (registerSizes.get('co', 100) + 1)
+    hr0 = [0] * (registerSizes.get('hr', 100) + 1)
+    ir0 = [0] * (registerSizes.get('ir', 100) + 1)
 
     # Create datastores for slaves
+    slaves = {}
     for slave in range(numberOfSlaves):
-        slaves[slave] = copy.deepcopy(baseDataStore)
+        slaves[slave] = VersionedDeviceContext(
+            di=ModbusSequentialDataBlock(0, di0),
+            co=ModbusSequentialDataBlock(0, co0),
+            hr=ModbusSequentialDataBlock(0, hr0),
+            ir=ModbusSequentialDataBlock(0, ir0)
+        )
 
     context = ModbusServerContext(devices=slaves, single=False)
 
@@ -65,16 +113,17 @@ class Server(threading.Thread):
             'ir': numberOfRegisters
         }
         self.running = False
-        self.regiser_type_map = {
-            "all": 0,
-            "co": 1,
-            "hr": 3,
-            "di": 2,
-            "ir": 4
-        }
+        self._rng = np.random.default_rng()
+        # Misconfigurations already reported by simulate, so they are logged once
+        self._warned = set()
 
         # Build the context
         self.context = buildModbusContext(numberOfSlaves, self.registerSizes)
+        self._device_ids = frozenset(self.context.device_ids())
+        self._blocks = {
+            slave: {code: self.context[slave].store[key] for code, key in _STORE_KEYS.items()}
+            for slave in self._device_ids
+        }
 
     def getDetails(self):
         """Get the server details"""
@@ -98,6 +147,17 @@ class Server(threading.Thread):
 
         return self.context[slave]
 
+    def get_context_version(self):
+        """Get a counter that changes whenever any slave's values are written"""
+        return sum(device.version for _, device in self.context)
+
+    def get_context_values(self):
+        """Get the modbus context as plain dicts: {slave: {"store": {kind: {address: value}}}}"""
+        return {
+            slave: {"store": {key: dict(block) for key, block in device.store.items()}}
+            for slave, device in self.context
+        }
+
     def get_coils(self, slave=0):
         """Get the coils"""
         return self.context[slave].getValues(1, 0, count=100)
@@ -184,83 +244,103 @@ class Server(threading.Thread):
         """Check if the server is running"""
         return self.running
 
+    def reset_warnings(self):
+        """Forget reported misconfigurations, e.g. when the register configs change"""
+        self._warned.clear()
+
+    def _warn_once(self, key, msg, *args):
+        """Log a warning the first time `key` is seen"""
+        if key in self._warned:
+            return
+        self._warned.add(key)
+        logger.warning(msg, *args)
+
     def simulate(self, registers):
         """Simulate registers with random values.
 
-        Each item in `registers` is expected to be a dict with keys like:
+        Each item in `registers` is expected to be a mapping (e.g. a row from
+        Database.get_registers) with keys like:
         {
             "server_id": <int>,
             "slave_id": <int>,
-            "register_type": "co"|"di"|"hr"|"ir"|"all",
+            "register_type": <int>,  # Type code from REGISTER_TYPE_MAP (0 = all)
             "address": <int>,
-            "address_end": <int|None>,  # Optional: end address for range
-            "register_size": <int|None>,  # Optional: override register size
-            "simulate": <bool>
+            "address_end": <int|None>,  # End address for range, None for a single address
+            "register_size": <int|None>,  # Size override, None to use the configured size
+            "simulate": <bool|int>
         }
         """
-        # Map: name -> Modbus function-code group
-        register_type_map = {"all": 0, "co": 1, "di": 2, "hr": 3, "ir": 4}
+        ctx = self.context
+        device_ids = self._device_ids
+        blocks = self._blocks
+        sizes_get = self.registerSizes.get
+        num = self.numberOfRegisters
+        server_id_self = self.serverId
+        rng = self._rng
+        names = REGISTER_TYPE_NAMES
+        warn_enabled = logger.isEnabledFor(logging.WARNING)
+        # Full blocks already written during this call, keyed by (slave, code, size)
+        written = set()
 
         for reg in registers:
-            if not reg.get("simulate"):
+            if not reg["simulate"]:
                 continue
             # If server_id is None, apply to all servers; otherwise match specific server
-            reg_server_id = reg.get("server_id")
-            if reg_server_id is not None and reg_server_id != self.serverId:
+            reg_server_id = reg["server_id"]
+            if reg_server_id is not None and reg_server_id != server_id_self:
                 continue
 
-            slave_id = reg.get("slave_id")
-            if slave_id not in self.context.device_ids():
-                logger.warning(
-                    "Slave ID %s not in context; skipping.", slave_id)
+            slave_id = reg["slave_id"]
+            if slave_id not in device_ids:
+                if warn_enabled:
+                    self._warn_once(("slave", slave_id),
+                                    "Slave ID %s not in context; skipping.", slave_id)
                 continue
 
-            reg_type_key = reg.get("register_type")
-            if reg_type_key not in register_type_map:
-                logger.warning("Unsupported register type: %r; skipping.",
-                               reg_type_key)
+            reg_type = reg["register_type"]
+            if reg_type not in names:
+                if warn_enabled:
+                    self._warn_once(("type", reg_type),
+                                    "Unsupported register type: %r; skipping.", reg_type)
                 continue
 
+            device = ctx[slave_id]
+
             # Get register size (use override if provided, otherwise use configured size)
-            register_size_override = reg.get("register_size")
-
-            # Helper to generate a block of values
-            def _gen_block(kind, count):
-                if kind in ("di", "co"):
-                    return [random.choice([True, False]) for _ in range(count)]
-                return [random.randrange(0, 500) for _ in range(count)]
-
-            # Write a full block for the given kind
-            def _write_full(kind):
-                code = register_type_map[kind]
-                # Use override size if provided, otherwise use configured size for this type
-                size = register_size_override if register_size_override is not None else self.registerSizes.get(kind, self.numberOfRegisters)
-                values = _gen_block(kind, size)
-                self.context[slave_id].setValues(code, 0, values)
+            register_size_override = reg["register_size"]
 
             # Handle "all" by writing every kind
-            if reg_type_key == "all":
-                for kind in ("co", "di", "hr", "ir"):
-                    _write_full(kind)
+            if reg_type == _ALL_TYPES:
+                device_blocks = blocks[slave_id]
+                for code, block in device_blocks.items():
+                    size = register_size_override if register_size_override is not None else sizes_get(names[code], num)
+                    key = (slave_id, code, size)
+                    if key in written:
+                        continue
+                    written.add(key)
+                    _write_full(block, code, size, rng)
+                # Direct block writes bypass setValues, so bump the version here
+                device.version += 1
                 continue
 
             # Handle a specific kind
-            reg_type_code = register_type_map[reg_type_key]
-            addr_start = int(reg.get("address", 0))
-            addr_end = reg.get("address_end")
+            reg_type_key = names[reg_type]
+            addr_start = int(reg["address"])
+            addr_end = reg["address_end"]
 
             # Get the max size for this register type
-            max_size = register_size_override if register_size_override is not None else self.registerSizes.get(reg_type_key, self.numberOfRegisters)
+            max_size = register_size_override if register_size_override is not None else sizes_get(reg_type_key, num)
 
             # Handle range simulation
             if addr_end is not None:
                 addr_end = int(addr_end)
                 if 0 <= addr_start < max_size and 0 <= addr_end < max_size and addr_start <= addr_end:
                     count = addr_end - addr_start + 1
-                    values = _gen_block(reg_type_key, count)
-                    self.context[slave_id].setValues(reg_type_code, addr_start, values)
-                else:
-                    logger.warning(
+                    values = _gen_block(reg_type, count, rng)
+                    device.setValues(reg_type, addr_start, values)
+                elif warn_enabled:
+                    self._warn_once(
+                        ("range", slave_id, reg_type, addr_start, addr_end, max_size),
                         "Address range %s..%s out of range 0..%s for slave %s (%s).",
                         addr_start,
                         addr_end,
@@ -270,10 +350,11 @@ class Server(threading.Thread):
                     )
             # Handle single address simulation
             elif 0 <= addr_start < max_size:
-                value = (_gen_block(reg_type_key, 1)[0])
-                self.context[slave_id].setValues(reg_type_code, addr_start, [value])
-            else:
-                logger.warning(
+                value = (_gen_block(reg_type, 1, rng)[0])
+                device.setValues(reg_type, addr_start, [value])
+            elif warn_enabled:
+                self._warn_once(
+                    ("address", slave_id, reg_type, addr_start, max_size),
                     "Address %s out of range 0..%s for slave %s (%s).",
                     addr_start,
                     max_size - 1,
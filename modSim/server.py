@@ -1,7 +1,9 @@
-import json
-import time
+import asyncio
 import os
 import logging
+import signal
+
+import orjson
 
 from modSim.database import Database
 from modSim.modbus import Server as ModbusServer
@@ -11,11 +13,12 @@ from modSim.web import WebServer
 logger = logging.getLogger(__name__)
 
 class Server:
-    def __init__(self):
+    def __init__(self, debug=False):
         self.signal_handler = SignalHandler()
         self.database = Database()
         self.settings_file = "settings.json"
-        
+        self._settings_cache = (None, None)  # (mtime_ns, settings)
+
         # Load initial settings from JSON file or create defaults
         self.settings = self.load_settings()
 
@@ -54,13 +57,15 @@ class Server:
                             default_configs.append(reg_config)
 
                     # Apply default configs to servers that don't have explicit configs
-                    expanded_registers = explicit_configs.copy()
-                    for reg_config in default_configs:
-                        for server_id in range(self.settings["modbus"]["instances"]):
-                            if server_id not in explicit_server_ids:
-                                expanded_config = reg_config.copy()
-                                expanded_config["server_id"] = server_id
-                                expanded_registers.append(expanded_config)
+                    missing_server_ids = [
+                        server_id for server_id in range(self.settings["modbus"]["instances"])
+                        if server_id not in explicit_server_ids
+                    ]
+                    expanded_registers = explicit_configs + [
+                        {**reg_config, "server_id": server_id}
+                        for reg_config in default_configs
+                        for server_id in missing_server_ids
+                    ]
 
                     result = self.database.save_registers(expanded_registers)
 
@@ -77,6 +82,7 @@ class Server:
             self.settings["web"]["port"],
             database=self.database,
             modbus_servers=self.modbus_servers,
+            debug=debug,
         )
         self.web_server.start()
 
@@ -86,8 +92,16 @@ class Server:
         create it with default values and return those values.
         """
         if os.path.exists(self.settings_file):
-            with open(self.settings_file, "r") as file:
-                return json.load(file)
+            # Skip re-parsing when the file has not changed since the last load/save
+            mtime = os.stat(self.settings_file).st_mtime_ns
+            cached_mtime, cached_settings = self._settings_cache
+            if mtime == cached_mtime:
+                return cached_settings
+
+            with open(self.settings_file, "rb") as file:
+                settings = orjson.loads(file.read())
+            self._settings_cache = (mtime, settings)
+            return settings
         
         # Default settings
         default_settings = {
@@ -127,23 +141,79 @@ class Server:
 
     def save_settings(self, settings):
         """Save settings to the settings.json file."""
-        with open(self.settings_file, "w") as file:
-            json.dump(settings, file, indent=4)
+        with open(self.settings_file, "wb") as file:
+            file.write(orjson.dumps(settings, option=orjson.OPT_INDENT_2))
+        self._settings_cache = (os.stat(self.settings_file).st_mtime_ns, settings)
 
     def stop_servers(self):
         """Stop all servers."""
         for server in self.modbus_servers.values():
             server.stop()
         self.web_server.stop()
-
-    def run(self):
+        self.database.close()
+
+    def partition_registers(self, registers):
+        """Split register configs by the modbus server they apply to."""
+        per_server = {server_id: [] for server_id in self.modbus_servers}
+        for reg in registers:
+            server_id = reg["server_id"]
+            if server_id is None:
+                for server_registers in per_server.values():
+                    server_registers.append(reg)
+            elif server_id in per_server:
+                per_server[server_id].append(reg)
+        return per_server
+
+    async def run_async(self):
         """ Main loop """
-        while not self.signal_handler.stop:
-            for server in self.modbus_servers.values():
-                server.simulate(self.database.get_registers())
-            time.sleep(1)
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        try:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            # Not supported on Windows; SignalHandler keeps catching signals and
+            # its flag is checked every tick below
+            pass
+
+        registers = None
+        per_server = {}
+        # Simulation failures already logged for the current registers
+        failures = set()
+        try:
+            # The SignalHandler flag also covers signals received while the servers were starting
+            while not stop_event.is_set() and not self.signal_handler.stop:
+                # The database hands back the same list until registers are saved again
+                latest = await loop.run_in_executor(None, self.database.get_registers)
+                if latest is not registers:
+                    registers = latest
+                    per_server = self.partition_registers(registers)
+                    # Report problems in the new configs even if they were seen before
+                    for server in self.modbus_servers.values():
+                        server.reset_warnings()
+                    failures.clear()
+
+                # A failing server is logged and skipped so the others keep simulating
+                server_ids = list(self.modbus_servers)
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(None, self.modbus_servers[server_id].simulate, per_server[server_id])
+                    for server_id in server_ids
+                ), return_exceptions=True)
+                for server_id, result in zip(server_ids, results):
+                    if isinstance(result, Exception) and (server_id, repr(result)) not in failures:
+                        failures.add((server_id, repr(result)))
+                        logger.error("Error simulating modbus server %s: %r", server_id, result)
+
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.stop_servers()
 
-        self.stop_servers()
+    def run(self):
+        """Run the main loop until SIGINT or SIGTERM is received."""
+        asyncio.run(self.run_async())
 
 if __name__ == "__main__":
     server = Server()
@@ -1,6 +1,10 @@
 """ Utility classes and functions """
 import signal
 
+# Map: register type name -> Modbus function-code group (0 simulates every type)
+REGISTER_TYPE_MAP = {"all": 0, "co": 1, "di": 2, "hr": 3, "ir": 4}
+REGISTER_TYPE_NAMES = {code: name for name, code in REGISTER_TYPE_MAP.items()}
+
 class SignalHandler:
     """Handle Signals"""
 
@@ -1,22 +1,50 @@
 import argparse
-from pydantic import BaseModel
+import asyncio
+from pydantic import BaseModel, ConfigDict, Field
 import logging
 import threading
+import time
 
+import orjson
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import uvloop  # noqa: F401
+    _EVENT_LOOP = "uvloop"
+except ImportError:  # uvloop is not available on Windows
+    _EVENT_LOOP = "asyncio"
+
+from modSim.utils import REGISTER_TYPE_NAMES
 
 logger = logging.getLogger(__name__)
 
 logging.getLogger("asyncio").setLevel(logging.WARNING)
 
+# How long a serialized /get-server-config response is reused, in seconds
+SERVER_CONFIG_TTL = 1.0
+
+class OrjsonResponse(JSONResponse):
+    """JSON response serialized with orjson, skipping FastAPI's jsonable_encoder"""
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+class RawJSONResponse(Response):
+    """JSON response whose content is already serialized to bytes"""
+    media_type = "application/json"
+
+    def render(self, content):
+        return content
+
 class ServerConfig(BaseModel):
     ip: str
     port: int
-    identity: dict  # Modbus identity as a dictionary
+    identity: dict[str, str]  # Modbus identity as a dictionary
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "ip": "0.0.0.0",
                 "port": 502,
@@ -27,12 +55,24 @@ class ServerConfig(BaseModel):
                 }
             }
         }
+    )
+
+class RegisterItem(BaseModel):
+    # slave_id and register_type are checked by Database.save_registers so
+    # missing values are reported in the endpoint's usual error format
+    server_id: int | None = None
+    slave_id: int | None = None
+    register_type: str | None = None
+    address: int = Field(default=0, ge=0)
+    address_end: int | None = Field(default=None, ge=0)
+    register_size: int | None = Field(default=None, ge=0)
+    simulate: bool = False
 
 class RegisterConfig(BaseModel):
-    registers: list  # List of registers to configure
+    registers: list[RegisterItem]  # List of registers to configure
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "registers": [
                     {
@@ -59,6 +99,40 @@ class RegisterConfig(BaseModel):
                 ]
             }
         }
+    )
+
+# API routes each WebServer binds to its own handlers: (path, handler name, methods, extra route options)
+_ROUTES = (
+    ("/configure-server", "configure_server_handler", ["POST"], {
+        # Keep documenting the expected body, although it is not parsed yet
+        "openapi_extra": {
+            "requestBody": {
+                "required": True,
+                "content": {"application/json": {"schema": ServerConfig.model_json_schema()}},
+            }
+        },
+    }),
+    ("/get-server-config", "get_server_config_handler", ["GET"], {}),
+    ("/configure-registers", "configure_registers_handler", ["POST"], {}),
+    ("/get-registers", "get_registers_handler", ["GET"], {}),
+    ("/get-context", "get_context_handler", ["GET"], {"response_class": RawJSONResponse}),
+)
+
+def _build_app(debug):
+    """Build the FastAPI app for a WebServer"""
+    return FastAPI(
+        title="modSim",
+        description="A configurable modbus simulator.",
+        version="0.0.1",
+        license_info={
+            "name": "Apache 2.0",
+            "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
+        },
+        openapi_url="/api/v1/openapi.json",
+        docs_url="/api/v1/docs",
+        default_response_class=OrjsonResponse,
+        debug=debug,
+    )
 
 class WebServer(threading.Thread):
     """Web interface Server"""
@@ -66,53 +140,38 @@ class WebServer(threading.Thread):
     def __init__(self, port, database, modbus_servers, debug=False):
         super().__init__()
         self._stop_event = threading.Event()
-        self.app = FastAPI(
-            title="modSim",
-            description="A configurable modbus simulator.",
-            version="0.0.1",
-            license_info={
-                "name": "Apache 2.0",
-                "url": "https://www.apache.org/licenses/LICENSE-2.0.html",
-            },
-            openapi_url="/api/v1/openapi.json",
-            docs_url="/api/v1/docs",
-        )
+        self.app = _build_app(debug)
         self.daemon = True
         self.database = database
         self.modbus_servers = modbus_servers
         self.debug = debug
         self.port = port
+        self._server_config_cache = (0.0, None)  # (expiry, serialized response body)
+        self._ctx_cache = {}  # server_id -> (context version, serialized response body)
+        self.refresh_server_details()
 
         # Setup endpoints
-        self.app.add_api_route(
-            path="/configure-server",
-            endpoint=self.configure_server_handler,
-            methods=["POST"],
-            include_in_schema=True,
-        )
-        self.app.add_api_route(
-            path="/get-server-config",
-            endpoint=self.get_server_config_handler,
-            methods=["GET"],
-            include_in_schema=True,
-        )
-        self.app.add_api_route(
-            path="/configure-registers",
-            endpoint=self.configure_registers_handler,
-            methods=["POST"],
-            include_in_schema=True,
-        )
-        self.app.add_api_route(
-            path="/get-registers",
-            endpoint=self.get_registers_handler,
-            methods=["GET"],
-            include_in_schema=True,
-        )
-        self.app.add_api_route(
-            path="/get-context",
-            endpoint=self.get_context_handler,
+        for path, handler, methods, options in _ROUTES:
+            self.app.add_api_route(
+                path=path,
+                endpoint=getattr(self, handler),
+                methods=methods,
+                include_in_schema=True,
+                **options,
+            )
+
+        # Serve the OpenAPI schema from bytes serialized once, instead of
+        # FastAPI's route which re-encodes the schema on every request
+        self._openapi_bytes = orjson.dumps(self.app.openapi())
+        self.app.router.routes = [
+            route for route in self.app.router.routes
+            if getattr(route, "path", None) != self.app.openapi_url
+        ]
+        self.app.add_route(
+            self.app.openapi_url,
+            self.openapi_handler,
             methods=["GET"],
-            include_in_schema=True,
+            include_in_schema=False,
         )
 
     def run(self):
@@ -121,7 +180,8 @@ class WebServer(threading.Thread):
             self.app,
             host="0.0.0.0",
             port=self.port,
-            reload=True,
+            loop=_EVENT_LOOP,
+            access_log=self.debug,
             log_config=None,
             log_level="debug" if self.debug else "error"
         )
@@ -137,59 +197,86 @@ class WebServer(threading.Thread):
         """Returns true when stop is called"""
         return self._stop_event.is_set()
 
-    def configure_server_handler(self, config: ServerConfig):
-        try:
-            raise NotImplementedError("Configure server handler not implemented.")
-            self.database.save_settings({
-                "ip": config.ip,
-                "port": config.port,
-                "identity": config.identity
-            })
-            self.settings = self.database.get_settings()
-            self.restart_server()
-            return {"success": True, "message": "Server configuration updated and server restarted."}
-        except Exception as e:
-            return {"success": False, "message": str(e)}
+    def refresh_server_details(self):
+        """Rebuild the cached server details (only called from __init__ for now)"""
+        self._server_details_cache = [s.getDetails() for s in self.modbus_servers.values()]
+        self._server_config_cache = (0.0, None)
+
+    async def openapi_handler(self, request):
+        return RawJSONResponse(self._openapi_bytes)
+
+    async def configure_server_handler(self):
+        # Not implemented yet: respond without reading or validating the request body
+        return OrjsonResponse(
+            {"success": False, "message": "Configure server handler not implemented."},
+            status_code=501,
+        )
 
-    def get_server_config_handler(self):
+    async def get_server_config_handler(self):
         try:
-            config = [s.getDetails() for s in self.modbus_servers.values()]
-            return {"success": True, "config": config}
+            expiry, body = self._server_config_cache
+            now = time.monotonic()
+            if body is None or now >= expiry:
+                # Only the running flag changes while servers stay registered
+                config = [
+                    {**details, "running": server.running}
+                    for details, server in zip(self._server_details_cache, self.modbus_servers.values())
+                ]
+                body = orjson.dumps({"success": True, "config": config})
+                self._server_config_cache = (now + SERVER_CONFIG_TTL, body)
+            return RawJSONResponse(body)
         except Exception as e:
-            return {"success": False, "message": str(e)}
+            return OrjsonResponse({"success": False, "message": str(e)})
         
-    def configure_registers_handler(self, config: RegisterConfig):
+    async def configure_registers_handler(self, config: RegisterConfig):
         try:
             # Save registers to the database
-            result = self.database.save_registers(config.registers)
+            registers = [reg.model_dump() for reg in config.registers]
+            result = await asyncio.to_thread(self.database.save_registers, registers)
 
             if not result["success"]:
-                return {"success": False, "message": result["errors"]}
+                return OrjsonResponse({"success": False, "message": result["errors"]})
             
-            return {"success": True, "message": "Registers configured."}
+            return OrjsonResponse({"success": True, "message": "Registers configured."})
         except Exception as e:
-            return {"success": False, "message": str(e)}
+            return OrjsonResponse({"success": False, "message": str(e)})
 
-    def get_registers_handler(self):
+    async def get_registers_handler(self):
         try:
-            registers = self.database.get_registers()
+            registers = await asyncio.to_thread(self.database.get_registers)
             if registers:
-                return {"success": True, "registers": registers}
-            return {"success": False, "message": "No registers found."}
+                # Registers are stored with type codes; report them by name
+                registers = [
+                    {
+                        **reg,
+                        "register_type": REGISTER_TYPE_NAMES[reg["register_type"]],
+                        "simulate": bool(reg["simulate"])
+                    }
+                    for reg in registers
+                ]
+                return OrjsonResponse({"success": True, "registers": registers})
+            return OrjsonResponse({"success": False, "message": "No registers found."})
         except Exception as e:
-            return {"success": False, "message": str(e)}
+            return OrjsonResponse({"success": False, "message": str(e)})
         
-    def get_context_handler(self, server_id: int):
+    async def get_context_handler(self, server_id: int):
         try:
-            self.modbus_server = self.modbus_servers.get(server_id)
-            if not self.modbus_server:
-                return {"success": False, "message": "Server not found."}
-            
-            context = self.modbus_server.get_context()
-            
-            return {"success": True, "context": context}
+            modbus_server = self.modbus_servers.get(server_id)
+            if not modbus_server:
+                return OrjsonResponse({"success": False, "message": "Server not found."})
+
+            # Reuse the serialized context until the server's values are written again
+            version = modbus_server.get_context_version()
+            cached = self._ctx_cache.get(server_id)
+            if cached is None or cached[0] != version:
+                context = modbus_server.get_context_values()
+                body = orjson.dumps({"success": True, "context": context}, option=orjson.OPT_NON_STR_KEYS)
+                cached = (version, body)
+                self._ctx_cache[server_id] = cached
+
+            return RawJSONResponse(cached[1])
         except Exception as e:
-            return {"success": False, "message": str(e)}
+            return OrjsonResponse({"success": False, "message": str(e)})
 
 if __name__ == "__main__":
     logging.basicConfig(